@@ -1,24 +1,42 @@
-from typing import Dict, Tuple, FrozenSet, Optional
-from schemas import *
-from statistics import stdev
+import numpy as np
+from typing import Dict, Tuple, List, Set, Optional, Iterable, Iterator
+from datetime import time
+from schemas import SessionType, DayOfWeek
+from core import TimetableCore, Course, Instructor, Room, TimeSlot, Section, ScheduledClass
+from scoring_nb import NUMBA_AVAILABLE, gap_penalty_nb, distribution_penalty_nb
+from propagation_nb import prune_neighbours_nb, restore_values_nb
 
 # --- Type Aliases ---
 
-Variable = Tuple[Course, FrozenSet[Section]]
-Domain = Tuple[TimeSlot, Optional[Room], Optional[Instructor]]
+# A Variable is a course session together with the bitmask of the sections attending it,
+# and their (shared) year, cached so the checks never have to decode the mask.
+# All refer to positions in the ProblemIndex, never to the Pydantic models themselves.
+Variable = Tuple[int, int, int]
+# A Domain value is a (timeslot, room, instructor) triple of ProblemIndex positions.
+Domain = Tuple[int, int, int]
 
-# An Assignment is the current state of the solution being built.
-Assignment = Dict[Variable, Domain]
+# An Assignment is the current state of the solution being built: the placements made
+# so far, in the order they were made.
+Assignment = List[Tuple[Variable, Domain]]
 
 # --- Clear Index Constants for Tuple Access ---
 
 VAR_COURSE = 0
 VAR_SECTIONS = 1
+VAR_YEAR = 2
 
 DOM_TIMESLOT = 0
 DOM_ROOM = 1
 DOM_INSTRUCTOR = 2
 
+# Columns of the (section, day, slot) placements array used for scoring.
+PLACE_SECTION = 0
+PLACE_DAY = 1
+PLACE_SLOT = 2
+
+# Marks a missing room or instructor (e.g. for 'Project' sessions).
+NO_ID = -1
+
 SLOT_ORDER = {
     time(9, 0): 0,
     time(10, 45): 1,
@@ -26,178 +44,574 @@ SLOT_ORDER = {
     time(14, 15): 3 
 }
 
+DAY_INDEX = {day: i for i, day in enumerate(DayOfWeek)}
+
+# The first and last slots of the day, which students would rather avoid.
+UNDESIRABLE_SLOTS = (0, 3)
+
 # --- Penalties for Soft Constraints Scoring ---
 
 _GAP_PENALTY = 5.0
 _UNDESIRABLE_SLOT_PENALTY = 3.0
 
+# Score solutions and forward check with the compiled kernels of scoring_nb and
+# propagation_nb instead of NumPy.
+USE_NUMBA = NUMBA_AVAILABLE
+
+# --- Integer Encoding of the Problem ---
+
+class ProblemIndex:
+    """
+    Dense integer encoding of the timetable entities, built once per solver.
+
+    Every entity is referred to by its position in the corresponding list, and the
+    attributes needed by the hard constraints are kept in parallel NumPy arrays, so
+    the search itself never touches the Pydantic models. Sections are additionally
+    mapped to bit positions, which turns a group of sections into a single integer.
+    """
+
+    def __init__(self, data: TimetableCore):
+        # Rows repeating a primary key describe the same entity, so only the first is kept.
+        self.courses: List[Course] = _unique_by(data.courses, lambda course: (course.course_id, course.type))
+        self.timeslots: List[TimeSlot] = _unique_by(data.timeslots, lambda ts: ts.timeslot_id)
+        self.rooms: List[Room] = _unique_by(data.rooms, lambda room: room.room_id)
+        self.instructors: List[Instructor] = _unique_by(data.instructors, lambda inst: inst.instructor_id)
+        self.sections: List[Section] = _unique_by(data.sections, lambda sec: (sec.year, sec.section_id))
+
+        self.course_index: Dict[Course, int] = {course: i for i, course in enumerate(self.courses)}
+        self.timeslot_index: Dict[str, int] = {ts.timeslot_id: i for i, ts in enumerate(self.timeslots)}
+        self.room_index: Dict[str, int] = {room.room_id: i for i, room in enumerate(self.rooms)}
+        self.instructor_index: Dict[int, int] = {inst.instructor_id: i for i, inst in enumerate(self.instructors)}
+        self.section_index: Dict[Tuple[int, int], int] = {(sec.year, sec.section_id): i for i, sec in enumerate(self.sections)}
+
+        self.course_is_project = np.array([course.type == SessionType.PROJECT for course in self.courses], dtype=np.bool_)
+        self.timeslot_day = np.array([DAY_INDEX[ts.day] for ts in self.timeslots], dtype=np.int8)
+        # Start times missing from SLOT_ORDER get NO_ID: those classes count toward the
+        # distribution penalty but sit outside the slot grid, so they never form gaps.
+        self.timeslot_slot = np.array([SLOT_ORDER.get(ts.start_time, NO_ID) for ts in self.timeslots], dtype=np.int8)
+        self.timeslot_undesirable = np.isin(self.timeslot_slot, UNDESIRABLE_SLOTS)
+        self.room_capacity = np.array([room.capacity for room in self.rooms], dtype=np.int32)
+        self.section_year = np.array([sec.year for sec in self.sections], dtype=np.int16)
+        self.section_group = np.array([sec.group_number for sec in self.sections], dtype=np.int16)
+
+        # Interned section handles: each year's, and each (year, group)'s, sections as one
+        # mask of section indices.
+        self.year_sections: Dict[int, int] = {}
+        self.group_sections: Dict[Tuple[int, int], int] = {}
+        for i, sec in enumerate(self.sections):
+            self.year_sections[sec.year] = self.year_sections.get(sec.year, 0) | (1 << i)
+            group = (sec.year, sec.group_number)
+            self.group_sections[group] = self.group_sections.get(group, 0) | (1 << i)
+
+    def sections_mask(self, sections: Iterable[Section]) -> int:
+        """Encodes a collection of sections as a bitmask."""
+        mask = 0
+        for section in sections:
+            mask |= 1 << self.section_index[(section.year, section.section_id)]
+        return mask
+
+    def mask_sections(self, mask: int) -> List[Section]:
+        """Decodes a bitmask back into the Section models it represents."""
+        return [self.sections[bit] for bit in iter_bits(mask)]
+
+def _unique_by(items: Iterable, key) -> List:
+    """Returns the items in their original order, keeping only the first one for each key."""
+    unique: Dict = {}
+    for item in items:
+        unique.setdefault(key(item), item)
+    return list(unique.values())
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yields the positions of the set bits of a mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+def iter_submasks(mask: int, size: int) -> Iterator[int]:
+    """
+    Yields the submasks of 'mask' with exactly 'size' bits set, in increasing order.
+    Gosper's hack walks the size-bit patterns over the mask's bit positions, which
+    are then spread back onto those positions.
+    """
+    bits = [1 << bit for bit in iter_bits(mask)]
+    if not 0 < size <= len(bits):
+        return
+    pattern = (1 << size) - 1
+    while pattern < 1 << len(bits):
+        yield sum(bits[position] for position in iter_bits(pattern))
+        lowest = pattern & -pattern
+        ripple = pattern + lowest
+        pattern = (((ripple ^ pattern) >> 2) // lowest) | ripple
+
+def _first_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+# --- Occupancy Tables ---
+
+class OccupancyTables:
+    """
+    Incrementally maintained "busy" tables for instructors, rooms and sections.
+
+    Each timeslot gets one int bitboard of busy instructors, one of busy rooms and one of
+    busy sections, with a bit per entity position, so every uniqueness check is a single
+    shift or AND instead of a scan over the whole assignment. The solver keeps the tables
+    in sync via push_assignment/pop_assignment. The per-day class and project counters
+    answer the "Project Day" constraint in the same way.
+    """
+
+    def __init__(self, index: ProblemIndex):
+        self.index = index
+        num_timeslots = len(index.timeslots)
+
+        self.instructor_slots: List[int] = [0] * num_timeslots
+        self.room_slots: List[int] = [0] * num_timeslots
+        self.section_slots: List[int] = [0] * num_timeslots
+
+        # Number of classes (and of which projects) each year has on each day, indexed by [year, day].
+        num_years = int(index.section_year.max()) + 1 if len(index.sections) else 1
+        self.classes_on_day = np.zeros((num_years, len(DayOfWeek)), dtype=np.int32)
+        self.projects_on_day = np.zeros((num_years, len(DayOfWeek)), dtype=np.int32)
+
+def _count_on_day(variable: Variable, domain: Domain, tables: OccupancyTables, delta: int):
+    """Adds delta to the per-day counters of the variable's year."""
+    course, _, year = variable
+    index = tables.index
+    day = index.timeslot_day[domain[DOM_TIMESLOT]]
+    tables.classes_on_day[year, day] += delta
+    if index.course_is_project[course]:
+        tables.projects_on_day[year, day] += delta
+
+def push_assignment(variable: Variable, domain: Domain, tables: OccupancyTables):
+    """Records a new placement in the occupancy tables."""
+    ts, room, instructor = domain
+    sections = variable[VAR_SECTIONS]
+    if instructor != NO_ID:
+        tables.instructor_slots[ts] |= 1 << instructor
+    if room != NO_ID:
+        tables.room_slots[ts] |= 1 << room
+    tables.section_slots[ts] |= sections
+    _count_on_day(variable, domain, tables, 1)
+
+def pop_assignment(variable: Variable, domain: Domain, tables: OccupancyTables):
+    """Removes a placement from the occupancy tables when the solver backtracks."""
+    ts, room, instructor = domain
+    sections = variable[VAR_SECTIONS]
+    if instructor != NO_ID:
+        tables.instructor_slots[ts] ^= 1 << instructor
+    if room != NO_ID:
+        tables.room_slots[ts] ^= 1 << room
+    tables.section_slots[ts] ^= sections
+    _count_on_day(variable, domain, tables, -1)
+
 # --- Hard Constraint Checking ---
 
 def is_consistent(
     variable: Variable,
     domain: Domain,
-    assignment: Assignment
+    tables: OccupancyTables
 ) -> Tuple[bool, Optional[str]]:
     """
     The main orchestrator for hard constraint checks.
 
     This function is called by the solver for each potential assignment to see if it
-    conflicts with any of the already placed classes in the current 'assignment'.
+    conflicts with any of the already placed classes, as recorded in the occupancy 'tables'.
     True if the proposed assignment is consistent (no conflicts), False otherwise.
     """
-    if _check_project_day_conflict(variable, domain, assignment):
+    course, sections, year = variable
+    ts, room, instructor = domain
+    index = tables.index
+
+    # A project takes its year's whole day: it can't share the day with any other class.
+    on_day = tables.classes_on_day if index.course_is_project[course] else tables.projects_on_day
+    if on_day[year, index.timeslot_day[ts]] > 0:
         return (False, "Project Conflict")
+    if instructor != NO_ID and (tables.instructor_slots[ts] >> instructor) & 1:
+        return (False, "Instructor Conflict")
+    if room != NO_ID and (tables.room_slots[ts] >> room) & 1:
+        return (False, "Room Conflict")
+    if tables.section_slots[ts] & sections:
+        return (False, "Section Conflict")
 
-    for existing_variable, existing_domain in assignment.items():
-        if _check_instructor_conflict(domain, existing_domain):
-            return (False, "Instructor Conflict")
-        if _check_room_conflict(domain, existing_domain):
-            return (False, "Room Conflict")
-        if _check_section_conflict(variable, domain, existing_variable, existing_domain):
-            return (False, "Section Conflict")
-        
     return (True, None)
 
-def _check_instructor_conflict(proposed_domain: Domain, existing_domain: Domain) -> bool:
-    """
-    Checks the "Instructor Uniqueness" constraint.
-    Returns True if there IS a conflict, False otherwise.
-    """
-    proposed_instructor = proposed_domain[DOM_INSTRUCTOR]
-    existing_instructor = existing_domain[DOM_INSTRUCTOR]
-
-    if proposed_instructor is None or existing_instructor is None:
-        return False
+# --- Forward Checking ---
 
-    is_same_instructor = proposed_instructor.instructor_id == existing_instructor.instructor_id
-    is_same_time = proposed_domain[DOM_TIMESLOT].timeslot_id == existing_domain[DOM_TIMESLOT].timeslot_id
-
-    return is_same_instructor and is_same_time
-
-def _check_room_conflict(proposed_domain: Domain, existing_domain: Domain) -> bool:
+class DomainStore:
     """
-    Checks the "Room Uniqueness" constraint.
-    Returns True if there IS a conflict, False otherwise.
-    """
-    proposed_room = proposed_domain[DOM_ROOM]
-    existing_room = existing_domain[DOM_ROOM]
-
-    if proposed_room is None or existing_room is None:
-        return False
+    The live domain of every course, maintained for forward checking.
 
-    is_same_room = proposed_room.room_id == existing_room.room_id
-    is_same_time = proposed_domain[DOM_TIMESLOT].timeslot_id == existing_domain[DOM_TIMESLOT].timeslot_id
-
-    return is_same_room and is_same_time
+    The candidate values of all courses are stored once in flat timeslot/room/instructor
+    arrays, each course owning the slice [course_start, course_end), with an 'alive' mask
+    marking the values still compatible with the current assignment. The per-course
+    dicts are views into those slices. Every pruning step pushes the positions it removed
+    on a trail, so the solver restores the domains on backtrack by undoing back to a mark.
+    """
 
-def _check_section_conflict(
-    proposed_variable: Variable,
-    proposed_domain: Domain,
-    existing_variable: Variable,
-    existing_domain: Domain
+    def __init__(self, index: ProblemIndex, course_domains: Dict[int, np.ndarray], course_sections: List[int]):
+        num_courses = len(index.courses)
+        values = np.concatenate([np.empty((0, 3), dtype=np.int64), *course_domains.values()])
+        self.value_timeslot = values[:, DOM_TIMESLOT].copy()
+        self.value_room = values[:, DOM_ROOM].copy()
+        self.value_instructor = values[:, DOM_INSTRUCTOR].copy()
+        self.value_day = index.timeslot_day[self.value_timeslot].astype(np.int64)
+        self.value_course = np.repeat(np.array(list(course_domains), dtype=np.int64), [len(domains) for domains in course_domains.values()])
+        self.value_alive = np.ones(len(values), dtype=np.bool_)
+        self.course_start = np.zeros(num_courses, dtype=np.int64)
+        self.course_end = np.zeros(num_courses, dtype=np.int64)
+        self.alive_count = np.zeros(num_courses, dtype=np.int64)
+
+        # A value is pruned at most once along a branch, so the trail never outgrows the values.
+        self.trail = np.empty(len(values), dtype=np.int64)
+        self.trail_top = np.zeros(1, dtype=np.int64)
+
+        self.timeslot: Dict[int, np.ndarray] = {}
+        self.day: Dict[int, np.ndarray] = {}
+        self.room: Dict[int, np.ndarray] = {}
+        self.instructor: Dict[int, np.ndarray] = {}
+        self.alive: Dict[int, np.ndarray] = {}
+
+        # Which courses can be affected by a placement, bucketed by the shared resource.
+        self.course_year: Dict[int, int] = {}
+        self.courses_by_year: Dict[int, List[int]] = {}
+        self.courses_by_room: Dict[int, List[int]] = {}
+        self.courses_by_instructor: Dict[int, List[int]] = {}
+
+        offset = 0
+        for course, domains in course_domains.items():
+            values_slice = slice(offset, offset + len(domains))
+            self.course_start[course], self.course_end[course] = offset, offset + len(domains)
+            offset += len(domains)
+            self.timeslot[course] = self.value_timeslot[values_slice]
+            self.day[course] = self.value_day[values_slice]
+            self.room[course] = self.value_room[values_slice]
+            self.instructor[course] = self.value_instructor[values_slice]
+            self.alive[course] = self.value_alive[values_slice]
+            self.alive_count[course] = len(domains)
+
+            year = int(index.section_year[_first_bit(course_sections[course])])
+            self.course_year[course] = year
+            self.courses_by_year.setdefault(year, []).append(course)
+            for room in np.unique(self.room[course]):
+                if room != NO_ID: self.courses_by_room.setdefault(int(room), []).append(course)
+            for instructor in np.unique(self.instructor[course]):
+                if instructor != NO_ID: self.courses_by_instructor.setdefault(int(instructor), []).append(course)
+
+    def live_values(self, course: int) -> List[Domain]:
+        """Returns the values of a course that are still alive, as Domain tuples."""
+        alive = self.alive[course]
+        return list(zip(
+            self.timeslot[course][alive].tolist(),
+            self.room[course][alive].tolist(),
+            self.instructor[course][alive].tolist()
+        ))
+
+    def prune(self, course: int, dead: np.ndarray) -> int:
+        """Removes the values flagged in 'dead' and returns how many values remain alive."""
+        killed = np.flatnonzero(dead & self.alive[course])
+        if len(killed):
+            self.alive[course][killed] = False
+            self.alive_count[course] -= len(killed)
+            top = self.trail_top[0]
+            self.trail[top:top + len(killed)] = killed + self.course_start[course]
+            self.trail_top[0] = top + len(killed)
+        return self.alive_count[course]
+
+    def mark(self) -> int:
+        """Returns a trail position that undo() can later roll back to."""
+        return int(self.trail_top[0])
+
+    def undo(self, mark: int):
+        """Restores every value pruned since 'mark' was taken."""
+        if USE_NUMBA:
+            restore_values_nb(mark, self.value_course, self.trail, self.value_alive, self.alive_count, self.trail_top)
+            return
+        revived = self.trail[mark:self.trail_top[0]]
+        self.value_alive[revived] = True
+        np.add.at(self.alive_count, self.value_course[revived], 1)
+        self.trail_top[0] = mark
+
+def _revise_instructor(store: DomainStore, course: int, ts: int, instructor: int) -> Optional[np.ndarray]:
+    """Values of 'course' that clash with an instructor taken at 'ts'."""
+    if instructor == NO_ID:
+        return None
+    return (store.timeslot[course] == ts) & (store.instructor[course] == instructor)
+
+def _revise_room(store: DomainStore, course: int, ts: int, room: int) -> Optional[np.ndarray]:
+    """Values of 'course' that clash with a room taken at 'ts'."""
+    if room == NO_ID:
+        return None
+    return (store.timeslot[course] == ts) & (store.room[course] == room)
+
+def _revise_sections(store: DomainStore, course: int, ts: int, remaining: int, tables: OccupancyTables) -> Optional[np.ndarray]:
+    """Values of 'course' at 'ts' once every one of its remaining sections is busy then."""
+    busy_sections = tables.section_slots[ts]
+    if busy_sections & remaining != remaining:
+        return None
+    return store.timeslot[course] == ts
+
+def _revise_project_day(store: DomainStore, course: int, day: int, is_project: bool, index: ProblemIndex) -> Optional[np.ndarray]:
+    """Values of 'course' on a day that a project now rules out for its year."""
+    if not is_project and not index.course_is_project[course]:
+        return None
+    return store.day[course] == day
+
+def forward_check(
+    variable: Variable,
+    domain: Domain,
+    unscheduled_sections_map: List[int],
+    tables: OccupancyTables,
+    store: DomainStore
 ) -> bool:
     """
-    Checks the "Section Uniqueness" constraint (a section can't be in two places at once).
-    Returns True if there IS a conflict, False otherwise.
-    """
-    shared_sections = proposed_variable[VAR_SECTIONS].intersection(existing_variable[VAR_SECTIONS])
-
-    if not shared_sections:
-        return False 
-
-    is_same_time = proposed_domain[DOM_TIMESLOT].timeslot_id == existing_domain[DOM_TIMESLOT].timeslot_id
-    
-    return is_same_time
+    Propagates a new placement to the live domains of the courses it constrains.
 
-def _check_project_day_conflict(
-    proposed_variable: Variable,
-    proposed_domain: Domain,
-    assignment: Assignment
+    This is AC-3 restricted to the arcs pointing at the placement just made: every
+    course sharing its instructor, room or year is revised against it, one binary
+    constraint at a time. 'tables' must already include the placement.
+    Returns False if a course with sections left to place runs out of values.
+    """
+    course, _, year = variable
+    ts, room, instructor = domain
+    index = tables.index
+    day = index.timeslot_day[ts]
+    is_project = bool(index.course_is_project[course])
+
+    same_year = set(store.courses_by_year[year])
+    neighbours = set(same_year)
+    if instructor != NO_ID:
+        neighbours.update(store.courses_by_instructor.get(instructor, ()))
+    if room != NO_ID:
+        neighbours.update(store.courses_by_room.get(room, ()))
+
+    if USE_NUMBA:
+        return _forward_check_compiled(neighbours, same_year, domain, day, is_project, unscheduled_sections_map, tables, store)
+
+    for other in neighbours:
+        remaining = unscheduled_sections_map[other]
+        if not remaining: continue
+
+        revisions = [_revise_instructor(store, other, ts, instructor), _revise_room(store, other, ts, room)]
+        if other in same_year:
+            revisions.append(_revise_sections(store, other, ts, remaining, tables))
+            revisions.append(_revise_project_day(store, other, day, is_project, index))
+
+        dead = None
+        for revision in revisions:
+            if revision is not None:
+                dead = revision if dead is None else dead | revision
+        if dead is not None and store.prune(other, dead) == 0:
+            return False
+
+    return True
+
+def _forward_check_compiled(
+    neighbours: Set[int],
+    same_year: Set[int],
+    domain: Domain,
+    day: int,
+    is_project: bool,
+    unscheduled_sections_map: List[int],
+    tables: OccupancyTables,
+    store: DomainStore
 ) -> bool:
     """
-    Checks the global "Project Day" constraint.
-    Returns True if there IS a conflict, False otherwise.
+    forward_check on the Numba kernel: the section and project day revisions are decided
+    per course here, and the kernel prunes all the courses' values in one pass.
     """
-    proposed_course = proposed_variable[VAR_COURSE]
-    proposed_year = next(iter(proposed_variable[VAR_SECTIONS])).year
-    proposed_day = proposed_domain[DOM_TIMESLOT].day
-
-    proposed_is_project = proposed_course.type == SessionType.PROJECT
-
-    for existing_variable, existing_domain in assignment.items():
-        existing_course = existing_variable[VAR_COURSE]
-        existing_year = next(iter(existing_variable[VAR_SECTIONS])).year
-        existing_day = existing_domain[DOM_TIMESLOT].day
-
-        if proposed_year == existing_year and proposed_day == existing_day:
-            existing_is_project = existing_course.type == SessionType.PROJECT
-
-            if proposed_is_project or existing_is_project:
-                return True
-
-    return False
+    ts, room, instructor = domain
+    busy_sections = tables.section_slots[ts]
+    courses, sections_full, day_taken = [], [], []
+    for other in neighbours:
+        remaining = unscheduled_sections_map[other]
+        if not remaining: continue
+        in_year = other in same_year
+        courses.append(other)
+        sections_full.append(in_year and busy_sections & remaining == remaining)
+        day_taken.append(in_year and (is_project or bool(tables.index.course_is_project[other])))
+
+    return prune_neighbours_nb(
+        np.array(courses, dtype=np.int64), np.array(sections_full, dtype=np.bool_), np.array(day_taken, dtype=np.bool_),
+        ts, room, instructor, int(day),
+        store.course_start, store.course_end, store.value_timeslot, store.value_room, store.value_instructor, store.value_day,
+        store.value_alive, store.alive_count, store.trail, store.trail_top
+    )
 
 # --- Soft Constraint Scoring ---
 
-def calculate_solution_score(schedule: List[ScheduledClass]) -> float:
+def calculate_solution_score(schedule: List[ScheduledClass], index: ProblemIndex) -> float:
     """
     The main orchestrator for scoring a complete, valid solution.
     """
     score = 0.0
 
-    section_timeslot_map: Dict[Tuple[int, int], List[TimeSlot]] = {}
-    for cls in schedule:
-        for section in cls.sections:
-            section_key = (section.year, section.section_id)
-            section_timeslot_map.setdefault(section_key, []).append(cls.timeslot)
+    placements = _build_section_placements(schedule, index)
 
-    score += _calculate_student_gap_penalty(section_timeslot_map)
-    score += _calculate_undesirable_slot_penalty(schedule)
-    score += _calculate_distribution_penalty(section_timeslot_map)
+    score += _calculate_student_gap_penalty(placements, index)
+    score += _calculate_undesirable_slot_penalty(schedule, index)
+    score += _calculate_distribution_penalty(placements, index)
 
     return score
 
-def _calculate_student_gap_penalty(section_timeslot_map: Dict[Tuple[int, int], List[TimeSlot]]) -> float:
+def _build_section_placements(schedule: List[ScheduledClass], index: ProblemIndex) -> np.ndarray:
+    """
+    Flattens a schedule into an int32 array with one (section, day, slot) row per
+    section attending a class.
+    """
+    section_ids = np.fromiter(
+        (index.section_index[(section.year, section.section_id)] for cls in schedule for section in cls.sections),
+        dtype=np.int32
+    )
+    timeslot_ids = np.fromiter(
+        (index.timeslot_index[cls.timeslot.timeslot_id] for cls in schedule for _ in cls.sections),
+        dtype=np.intp
+    )
+    return np.stack([section_ids, index.timeslot_day[timeslot_ids], index.timeslot_slot[timeslot_ids]], axis=1).astype(np.int32)
+
+def _calculate_student_gap_penalty(placements: np.ndarray, index: ProblemIndex) -> float:
     """
     Calculates the total penalty for all gaps in student schedules.
     """
-    score = 0.0
-    for _, timeslots in section_timeslot_map.items():
-        day_grouping: Dict[DayOfWeek, List[TimeSlot]] = {}
-        for ts in timeslots:
-            day_grouping.setdefault(ts.day, []).append(ts)
-
-        for _, daily_timeslots in day_grouping.items():
-            if len(daily_timeslots) < 2: continue
-            daily_timeslots.sort(key=lambda ts: ts.start_time)
-            slot_indices = [SLOT_ORDER[ts.start_time] for ts in daily_timeslots]
-
-            for i in range(len(slot_indices) - 1):
-                gap_size = (slot_indices[i+1] - slot_indices[i]) - 1
-                if gap_size > 0:
-                    score += _GAP_PENALTY * gap_size
-    return score
+    num_days, num_slots = len(DayOfWeek), len(SLOT_ORDER)
+    if USE_NUMBA:
+        return _GAP_PENALTY * gap_penalty_nb(
+            placements[:, PLACE_SECTION], placements[:, PLACE_DAY], placements[:, PLACE_SLOT],
+            len(index.sections), num_days, num_slots
+        )
+
+    # Which slots each (section, day) occupies, as rows of a presence grid, so no sorting is needed.
+    placements = placements[placements[:, PLACE_SLOT] >= 0]
+    keys = (placements[:, PLACE_SECTION] * num_days + placements[:, PLACE_DAY]) * num_slots + placements[:, PLACE_SLOT]
+    occupied = np.bincount(keys, minlength=len(index.sections) * num_days * num_slots).reshape(-1, num_slots) > 0
+    return _GAP_PENALTY * float(_gap_sizes(occupied).sum())
+
+def _gap_sizes(occupied: np.ndarray) -> np.ndarray:
+    """
+    Counts the gaps of each day from a boolean presence grid whose last axis is the slot.
+    The gaps of a day add up to the free slots between its first and last class.
+    """
+    num_slots = occupied.shape[-1]
+    classes = occupied.sum(axis=-1)
+    first = occupied.argmax(axis=-1)
+    last = num_slots - 1 - occupied[..., ::-1].argmax(axis=-1)
+    return np.where(classes > 0, last - first + 1 - classes, 0)
 
-def _calculate_undesirable_slot_penalty(schedule: List[ScheduledClass]) -> float:
+def _calculate_undesirable_slot_penalty(schedule: List[ScheduledClass], index: ProblemIndex) -> float:
     """
     Calculates the penalty for scheduling classes in the first or last slot of the day.
     """
-    first_last_slots_count = sum([1 for cls in schedule if SLOT_ORDER.get(cls.timeslot.start_time) in [0, 3]])
+    timeslot_ids = np.fromiter((index.timeslot_index[cls.timeslot.timeslot_id] for cls in schedule), dtype=np.intp)
+    first_last_slots_count = np.count_nonzero(index.timeslot_undesirable[timeslot_ids])
     return first_last_slots_count * _UNDESIRABLE_SLOT_PENALTY
 
-def _calculate_distribution_penalty(section_timeslot_map: Dict[Tuple[int, int], List[TimeSlot]]) -> float:
+def _calculate_distribution_penalty(placements: np.ndarray, index: ProblemIndex) -> float:
     """
     Calculates the penalty for uneven distribution of classes across the week.
     """
-    score = 0.0
-    for _, timeslots in section_timeslot_map.items():
-        daily_counts = {day: 0 for day in DayOfWeek}
-        for ts in timeslots:
-            daily_counts[ts.day] += 1
-        
-        class_counts_per_day = list(daily_counts.values())
-        if len(class_counts_per_day) < 2: continue
-
-        unbalance_penalty = stdev(class_counts_per_day)
-        score += unbalance_penalty
-    return score
+    if USE_NUMBA:
+        return distribution_penalty_nb(placements[:, PLACE_SECTION], placements[:, PLACE_DAY], len(index.sections), len(DayOfWeek))
+
+    daily_counts = np.zeros((len(index.sections), len(DayOfWeek)), dtype=np.int32)
+    np.add.at(daily_counts, (placements[:, PLACE_SECTION], placements[:, PLACE_DAY]), 1)
+
+    # Sample standard deviation, as statistics.stdev computes it.
+    return float(daily_counts[np.unique(placements[:, PLACE_SECTION])].std(axis=1, ddof=1).sum())
+
+# --- Incremental Scoring ---
+
+class Scorer:
+    """
+    The soft constraint score of an assignment, maintained incrementally.
+
+    The scorer keeps, for every section, its classes per (day, slot) and per day, and
+    the gaps and distribution penalty they add up to. Placing or removing a class only
+    updates the counts and marks its sections dirty; score() then recomputes the
+    penalties of the dirty sections alone. calculate_solution_score remains the full
+    recompute.
+    """
+
+    def __init__(self, index: ProblemIndex):
+        self.index = index
+        num_sections, num_days, num_slots = len(index.sections), len(DayOfWeek), len(SLOT_ORDER)
+        self.classes_at = np.zeros((num_sections, num_days, num_slots), dtype=np.int32)
+        self.daily_counts = np.zeros((num_sections, num_days), dtype=np.int32)
+        self.section_gaps = np.zeros(num_sections, dtype=np.int64)
+        self.section_spread = np.zeros(num_sections, dtype=np.float64)
+        self.undesirable_count = 0
+        self.dirty_sections = 0
+        # Classes each section has yet to attend, as set by set_workload.
+        self.classes_left = np.zeros(num_sections, dtype=np.int32)
+
+    def push(self, variable: Variable, domain: Domain):
+        """Adds a placement to the score."""
+        self._update(variable, domain, 1)
+
+    def pop(self, variable: Variable, domain: Domain):
+        """Removes a placement from the score."""
+        self._update(variable, domain, -1)
+
+    def score(self) -> float:
+        """Returns the score of the current assignment."""
+        self._refresh()
+        penalty = _GAP_PENALTY * self.section_gaps.sum() + self.section_spread.sum()
+        return float(penalty) + self.undesirable_count * _UNDESIRABLE_SLOT_PENALTY
+
+    def set_workload(self, unscheduled_sections_map: List[int]):
+        """Records how many classes each section attends once the assignment is complete."""
+        self.classes_left[:] = 0
+        for sections in unscheduled_sections_map:
+            for section in iter_bits(sections):
+                self.classes_left[section] += 1
+
+    def lower_bound(self) -> float:
+        """
+        Returns a score that no completion of the current assignment can go below.
+
+        Undesirable slots only accumulate, and each class a section has left fills at most
+        one of its gaps, so the bound is the undesirable penalty so far, plus the gaps that
+        outnumber each section's remaining classes, plus the smallest standard deviation
+        its daily counts can reach: the one left by pouring its remaining classes into its
+        emptiest days.
+        """
+        self._refresh()
+        counts = self.daily_counts
+        left = self.classes_left
+        num_days = counts.shape[1]
+
+        # The highest level every day can be filled up to, and the classes left over after it.
+        levels = np.arange(int(counts.max() + left.max()) + 1)
+        fill = np.maximum(levels[None, :, None] - counts[:, None, :], 0).sum(axis=2)
+        level = (fill <= left[:, None]).sum(axis=1) - 1
+        leftover = left - fill[np.arange(len(counts)), level]
+
+        final = np.maximum(counts, level[:, None]).astype(np.float64)
+        squares = (final ** 2).sum(axis=1) + leftover * (2 * level + 1)
+        total = counts.sum(axis=1) + left
+        variance = (squares - total ** 2 / num_days) / (num_days - 1)
+        spread = float(np.sqrt(np.maximum(variance, 0.0)).sum())
+        gaps = float(np.maximum(self.section_gaps - left, 0).sum())
+        return _GAP_PENALTY * gaps + spread + self.undesirable_count * _UNDESIRABLE_SLOT_PENALTY
+
+    def _refresh(self):
+        """Recomputes the gaps and distribution penalty of the dirty sections."""
+        if not self.dirty_sections: return
+        sections = list(iter_bits(self.dirty_sections))
+        self.section_gaps[sections] = _gap_sizes(self.classes_at[sections] > 0).sum(axis=1)
+        self.section_spread[sections] = self.daily_counts[sections].std(axis=1, ddof=1)
+        self.dirty_sections = 0
+
+    def _update(self, variable: Variable, domain: Domain, delta: int):
+        index = self.index
+        sections = variable[VAR_SECTIONS]
+        ts = domain[DOM_TIMESLOT]
+        day = int(index.timeslot_day[ts])
+        slot = int(index.timeslot_slot[ts])
+        # A class holds a handful of sections, so scalar updates beat fancy indexing here.
+        for section in iter_bits(sections):
+            if slot >= 0:
+                self.classes_at[section, day, slot] += delta
+            self.daily_counts[section, day] += delta
+            self.classes_left[section] -= delta
+        if index.timeslot_undesirable[ts]:
+            self.undesirable_count += delta
+        self.dirty_sections |= sections
@@ -0,0 +1,98 @@
+"""
+Slotted, frozen dataclass mirrors of the schema models, used inside the solver.
+
+Pydantic validates the data once, when it is loaded, and again only at the JSON
+boundary of a finished Solution. In between, to_core() converts everything a single
+time so the solver works with plain slot attributes instead of Pydantic models.
+"""
+
+from dataclasses import dataclass
+from datetime import time
+from typing import Optional, Tuple
+import schemas
+from schemas import SessionType, DayOfWeek, InstructorRole
+
+
+@dataclass(slots=True, frozen=True)
+class Course:
+    """A single schedulable session, mirroring schemas.Course."""
+    course_id: str
+    course_name: str
+    type: SessionType
+
+@dataclass(slots=True, frozen=True)
+class Instructor:
+    """An instructor, mirroring schemas.Instructor."""
+    instructor_id: int
+    name: str
+    role: InstructorRole
+    qualifications: Tuple[str, ...]
+
+@dataclass(slots=True, frozen=True)
+class Room:
+    """A physical room, mirroring schemas.Room."""
+    room_id: str
+    types: Tuple[SessionType, ...]
+    capacity: int
+
+@dataclass(slots=True, frozen=True)
+class TimeSlot:
+    """A weekly time slot, mirroring schemas.TimeSlot."""
+    timeslot_id: str
+    day: DayOfWeek
+    start_time: time
+    end_time: time
+
+@dataclass(slots=True, frozen=True)
+class Section:
+    """A group of students, mirroring schemas.Section."""
+    section_id: int
+    group_number: int
+    year: int
+    student_count: int
+
+@dataclass(slots=True, frozen=True)
+class Curriculum:
+    """A (year, course) requirement, mirroring schemas.Curriculum."""
+    year: int
+    course_id: str
+
+@dataclass(slots=True, frozen=True)
+class TimetableCore:
+    """All the entities of a TimetableData, converted once for the solver."""
+    courses: Tuple[Course, ...]
+    instructors: Tuple[Instructor, ...]
+    rooms: Tuple[Room, ...]
+    timeslots: Tuple[TimeSlot, ...]
+    sections: Tuple[Section, ...]
+    curriculum: Tuple[Curriculum, ...]
+
+@dataclass(slots=True, frozen=True)
+class ScheduledClass:
+    """A scheduled class, mirroring schemas.ScheduledClass."""
+    course: Course
+    timeslot: TimeSlot
+    room: Optional[Room]
+    instructor: Optional[Instructor]
+    sections: Tuple[Section, ...]
+
+# --- Conversions at the Pydantic Boundary ---
+
+def to_core(data: schemas.TimetableData) -> TimetableCore:
+    """
+    Converts the validated TimetableData into its dataclass mirror.
+    """
+    return TimetableCore(
+        courses=tuple(Course(c.course_id, c.course_name, c.type) for c in data.courses),
+        instructors=tuple(Instructor(i.instructor_id, i.name, i.role, tuple(i.qualifications)) for i in data.instructors),
+        rooms=tuple(Room(r.room_id, tuple(r.types), r.capacity) for r in data.rooms),
+        timeslots=tuple(TimeSlot(ts.timeslot_id, ts.day, ts.start_time, ts.end_time) for ts in data.timeslots),
+        sections=tuple(Section(s.section_id, s.group_number, s.year, s.student_count) for s in data.sections),
+        curriculum=tuple(Curriculum(c.year, c.course_id) for c in data.curriculum)
+    )
+
+def to_schema(scheduled_class: ScheduledClass) -> schemas.ScheduledClass:
+    """
+    Converts a scheduled class back into the Pydantic model used for output.
+    """
+    return schemas.ScheduledClass.model_validate(scheduled_class, from_attributes=True)
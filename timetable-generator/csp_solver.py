@@ -1,49 +1,101 @@
+import os
 import time
-from typing import Dict, List, Optional, Tuple, FrozenSet, Iterator
+import multiprocessing
+import numpy as np
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple, FrozenSet
 from schemas import (
     TimetableData, Solution,
-    SessionType, Course, Section,
-    Instructor, Room, TimeSlot,
-    InstructorRole, ScheduledClass, SolverMode
+    SessionType, InstructorRole,
+    SolverMode, DayOfWeek
 )
+from core import Course, ScheduledClass, to_core, to_schema
 from constraints import (
     Variable,
     Domain,
     Assignment,
+    ProblemIndex,
+    OccupancyTables,
+    DomainStore,
+    Scorer,
+    iter_submasks,
     is_consistent,
+    forward_check,
+    push_assignment,
+    pop_assignment,
     calculate_solution_score,
-    DOM_ROOM
+    DOM_TIMESLOT,
+    DOM_ROOM,
+    NO_ID
 )
 from data_loader import load_timetable_data_from_excel
-from copy import deepcopy
-from itertools import combinations
 from pathlib import Path
 
 STANDARD_SECTION_PLANNING_SIZE = 15
 
+# --- Restarted Search ---
+# Each search run expands at most RESTART_NODE_LIMIT nodes before it starts over with a
+# randomized value order. The budget grows by RESTART_GROWTH per restart, so a run is
+# eventually long enough to finish and the search stays complete.
+RESTART_NODE_LIMIT = 300
+RESTART_GROWTH = 1.1
+# How far (as a fraction of the domain) a value may move from its LCV rank after a restart.
+RESTART_JITTER = 0.4
+
+# --- Parallel Search ---
+# Extra seconds the OPTIMIZE workers get, past the timeout, to report their best solution.
+PARALLEL_RESULT_GRACE = 5.0
+# Forked workers skip re-importing the solver and its Numba kernels. None of the kernels
+# start threads, so forking is safe; platforms without fork fall back to spawn.
+PARALLEL_START_METHOD = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
 class CSPSolver:
     """
     The main engine for solving the timetable Constraint Satisfaction Problem.
     """
 
-    def __init__(self, timetable_data: TimetableData, mode: SolverMode):
+    def __init__(self, timetable_data: TimetableData, mode: SolverMode, seed: int = 0, verbose: bool = False):
         """
         Initializes the solver with all necessary data and prepares
-        internal data structures for efficient lookups.
+        internal data structures for efficient lookups. Progress is only
+        printed when 'verbose' is set.
         """
-        self.data = timetable_data
+        self.verbose = verbose
+        self.timetable_data = timetable_data
+        self.data = to_core(timetable_data)
         self.mode = mode
+        self.index = ProblemIndex(self.data)
 
         self.course_map: Dict[Tuple[str, SessionType], Course] = {}
         self.curriculum_map: Dict[int, List[str]] = {}
-        self.sections_map: Dict[int, List[Section]] = {}
-        self.instructors_map: Dict[str, List[Instructor]] = {}
-        self.rooms_map: Dict[SessionType, List[Room]] = {}
-        self.unscheduled_sections_map: Dict[Course, FrozenSet[Section]] = {}
+        self.instructors_map: Dict[str, List[int]] = {}
+        self.lecture_instructors: Dict[str, List[int]] = {}
+        self.ta_instructors: Dict[str, List[int]] = {}
+        self.rooms_map: Dict[SessionType, List[int]] = {}
+        self.unscheduled_sections_map: List[int] = [0] * len(self.index.courses)
+        self.courses_to_schedule: Tuple[int, ...] = ()
+        self.tables = OccupancyTables(self.index)
+        self.scorer: Optional[Scorer] = Scorer(self.index) if mode == SolverMode.OPTIMIZE else None
+        self.domains: Optional[DomainStore] = None
+        self.course_neighbours: Dict[int, FrozenSet[int]] = {}
+        self.room_group_size: List[int] = []
+        self.groups_cache: Dict[Tuple[int, int], Tuple[int, ...]] = {}
 
         self.best_assignment: Optional[Assignment] = None
         self.best_score: float = float('inf')
         self.search_terminated: bool = False
+
+        self.rng = np.random.default_rng(seed)
+        self.value_jitter: float = 0.0
+        self.nodes_left: int = RESTART_NODE_LIMIT
+        self.restart_pending: bool = False
+        # (course, section) pairs the current branch has yet to place.
+        self.sections_left: int = 0
+
+        # Set in parallel workers: the values of the first course this worker may try,
+        # and the best score found by any worker, shared between the processes.
+        self.root_values: Optional[FrozenSet[Domain]] = None
+        self.shared_best = None
         
         self._initialize_internal_lookups()
 
@@ -52,189 +104,452 @@ class CSPSolver:
         The main public entry point to start the solving process.
         """
         try:
-            print(f"Starting solver in '{self.mode.value}' mode...")
-            if self.mode == SolverMode.OPTIMIZE:
-                print(f"Searching for the best solution within {timeout_seconds} seconds.")
+            if self.verbose:
+                print(f"Starting solver in '{self.mode.value}' mode...")
+                if self.mode == SolverMode.OPTIMIZE:
+                    print(f"Searching for the best solution within {timeout_seconds} seconds.")
             
+            final_assignment = self._search(time.time(), timeout_seconds)
+            return self._build_solution(final_assignment, self.best_score if self.mode == SolverMode.OPTIMIZE else None)
+        except Exception as e:
+            raise ValueError(f"Fatal Error: failed to run the solver. Reason: {e}")
+
+    def solve_parallel(self, timeout_seconds: int = 300, n_workers: Optional[int] = None) -> Optional[Solution]:
+        """
+        Solves with several worker processes, splitting the search space between them.
+
+        The values of the first course chosen by MRV are dealt round-robin to the workers,
+        so each one searches a disjoint part of the tree with its own restart seed. In
+        FIND_FIRST mode the first solution returned wins; in OPTIMIZE mode the workers
+        share their best score and the best of their solutions is returned.
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        selection = self._select_next_course_to_schedule(self.unscheduled_sections_map)
+        if n_workers < 2 or selection is None or len(selection[1]) < 2:
+            return self.solve(timeout_seconds)
+
+        try:
+            if self.verbose:
+                print(f"Starting {n_workers} parallel solvers in '{self.mode.value}' mode...")
+            root_values = selection[1]
+            context = multiprocessing.get_context(PARALLEL_START_METHOD)
+            # The workers' OPTIMIZE clocks start here too, so they stop before the deadline below.
             start_time = time.time()
-            initial_assignment: Assignment = {}
-            
-            final_assignment = self._backtrack(initial_assignment, self.unscheduled_sections_map, start_time, timeout_seconds)
-            
-            if self.mode == SolverMode.OPTIMIZE:
-                final_assignment = self.best_assignment
+            shared_best = context.Value('d', float('inf'))
+            workers, readers = [], []
+            for worker in range(min(n_workers, len(root_values))):
+                reader, writer = context.Pipe(duplex=False)
+                workers.append(context.Process(
+                    target=_solve_worker,
+                    args=(self.timetable_data, self.mode, worker, frozenset(root_values[worker::n_workers]), start_time, timeout_seconds, shared_best, writer, self.verbose),
+                    daemon=True
+                ))
+                readers.append(reader)
+            for worker in workers:
+                worker.start()
 
-            if not final_assignment:
-                return None
-            
-            solution = self._format_solution(final_assignment)
-            if self.mode == SolverMode.OPTIMIZE:
-                solution.score = self.best_score
-            else:
-                solution.score = calculate_solution_score(solution.schedule)
-            
-            return solution
+            # Each worker reports through its own pipe. Its sentinel is watched as well, since
+            # a worker killed by a signal never reports: it then counts as (None, None).
+            waiting = {}
+            for i, worker in enumerate(workers):
+                waiting[readers[i]] = waiting[worker.sentinel] = i
+
+            # Like solve(), FIND_FIRST waits for as long as the search takes.
+            deadline = start_time + timeout_seconds + PARALLEL_RESULT_GRACE
+            best_assignment, best_score = None, None
+            try:
+                while waiting:
+                    timeout = max(0.0, deadline - time.time()) if self.mode == SolverMode.OPTIMIZE else None
+                    ready = wait(list(waiting), timeout)
+                    if not ready:
+                        if self.verbose:
+                            print("\n--- Timeout reached! Terminating search. ---")
+                        break
+                    i = waiting[ready[0]]
+                    del waiting[readers[i]], waiting[workers[i].sentinel]
+                    assignment, score = _receive_result(readers[i])
+                    if assignment is None: continue
+                    if self.mode == SolverMode.FIND_FIRST:
+                        best_assignment = assignment
+                        break
+                    if best_score is None or score < best_score:
+                        best_assignment, best_score = assignment, score
+            finally:
+                for worker in workers:
+                    worker.terminate()
+                    worker.join()
+
+            return self._build_solution(best_assignment, best_score)
         except Exception as e:
-            raise ValueError(f"Fatal Error: failed to run the solver. Reason: {e}")
+            raise ValueError(f"Fatal Error: failed to run the parallel solver. Reason: {e}")
+
+    def _search(self, start_time: float, timeout_seconds: int) -> Optional[Assignment]:
+        """
+        Runs the restarted backtracking search and returns the assignment it settled on.
+        """
+        node_limit = RESTART_NODE_LIMIT
+        while True:
+            initial_assignment: Assignment = []
+            self.nodes_left = node_limit
+            self.restart_pending = False
+            self.sections_left = sum(sections.bit_count() for sections in self.unscheduled_sections_map)
+
+            final_assignment = self._backtrack(initial_assignment, list(self.unscheduled_sections_map), start_time, timeout_seconds)
+
+            # Stop on a solution, on timeout, or once a run finished within its budget.
+            if final_assignment or self.search_terminated or not self.restart_pending:
+                break
+            node_limit = int(node_limit * RESTART_GROWTH)
+            self.value_jitter = RESTART_JITTER
+
+        if self.mode == SolverMode.OPTIMIZE:
+            return self.best_assignment
+        return final_assignment
+
+    def _build_solution(self, assignment: Optional[Assignment], score: Optional[float] = None) -> Optional[Solution]:
+        """
+        Decodes an assignment into a Solution, scoring it unless its score is already known.
+        """
+        if not assignment:
+            return None
+        schedule = self._decode_assignment(assignment)
+        if score is None:
+            score = calculate_solution_score(schedule, self.index)
+        return self._format_solution(schedule, score)
 
     def _initialize_internal_lookups(self):
         """
         Initializes the fast internal lookup maps from the raw TimetableData.
         """
-        for course in self.data.courses:
+        for course in self.index.courses:
             self.course_map[(course.course_id, course.type)] = course
         
         for curr in self.data.curriculum:
             self.curriculum_map.setdefault(curr.year, []).append(curr.course_id)
 
-        for section in self.data.sections:
-            self.sections_map.setdefault(section.year, []).append(section)
-
-        for instructor in self.data.instructors:
+        for instructor_idx, instructor in enumerate(self.index.instructors):
             for qualification in instructor.qualifications:
-                self.instructors_map.setdefault(qualification, []).append(instructor)
+                self.instructors_map.setdefault(qualification, []).append(instructor_idx)
+                if instructor.role in [InstructorRole.DOCTOR, InstructorRole.PROFESSOR]:
+                    self.lecture_instructors.setdefault(qualification, []).append(instructor_idx)
+                elif instructor.role == InstructorRole.TEACHING_ASSISTANT:
+                    self.ta_instructors.setdefault(qualification, []).append(instructor_idx)
 
-        for room in self.data.rooms:
+        for room_idx, room in enumerate(self.index.rooms):
             for room_type in room.types:
-                self.rooms_map.setdefault(room_type, []).append(room)
+                self.rooms_map.setdefault(room_type, []).append(room_idx)
+            self.room_group_size.append(room.capacity // STANDARD_SECTION_PLANNING_SIZE)
 
+        sections_by_course: Dict[int, int] = {}
         for year, course_ids in self.curriculum_map.items():
-            sections_for_year = self.sections_map.get(year, [])
-            if not sections_for_year: continue
-            sections_to_schedule = frozenset(sections_for_year)
+            sections_to_schedule = self.index.year_sections.get(year, 0)
+            if not sections_to_schedule: continue
             for course_id in course_ids:
                 for session_type in SessionType:
                     course_key = (course_id, session_type)
                     course_obj = self.course_map.get(course_key)
                     if course_obj:
-                        self.unscheduled_sections_map[course_obj] = sections_to_schedule
+                        sections_by_course[self.index.course_index[course_obj]] = sections_to_schedule
+        for course, sections in sections_by_course.items():
+            self.unscheduled_sections_map[course] = sections
+        self.courses_to_schedule = tuple(sections_by_course)
+        if self.scorer:
+            self.scorer.set_workload(self.unscheduled_sections_map)
+
+        course_domains = {course: self._generate_valid_domains(course) for course in self.courses_to_schedule}
+        self.domains = DomainStore(self.index, course_domains, self.unscheduled_sections_map)
+
+        # Two courses constrain each other when they share a year (sections, project day)
+        # or could be taught by the same instructor.
+        for course in self.courses_to_schedule:
+            neighbours = set(self.domains.courses_by_year[self.domains.course_year[course]])
+            for instructor in np.unique(self.domains.instructor[course]):
+                neighbours.update(self.domains.courses_by_instructor.get(int(instructor), ()))
+            neighbours.discard(course)
+            self.course_neighbours[course] = frozenset(neighbours)
 
-    def _generate_valid_domains(self, course: Course) -> List[Domain]:
+    def _generate_valid_domains(self, course_idx: int) -> np.ndarray:
         """ 
-        Generates all possible valid domain tuples for a given Course.
+        Generates all possible valid domain values for a given course, as the rows of
+        an (N, 3) array of (timeslot, room, instructor) positions.
         """
+        course = self.index.courses[course_idx]
+        timeslot_ids = np.arange(len(self.index.timeslots), dtype=np.int64)
         if course.type == SessionType.PROJECT:
-            return [(ts, None, None) for ts in self.data.timeslots]
+            no_ids = np.full_like(timeslot_ids, NO_ID)
+            return np.column_stack((timeslot_ids, no_ids, no_ids))
         
         valid_rooms = self.rooms_map.get(course.type, [])
-        qualified_instructors = self.instructors_map.get(course.course_id, [])
-        valid_instructors: List[Instructor] = []
+        valid_instructors: List[int] = []
         if course.type == SessionType.LECTURE:
-            valid_instructors = [inst for inst in qualified_instructors if inst.role in [InstructorRole.DOCTOR, InstructorRole.PROFESSOR]]
+            valid_instructors = self.lecture_instructors.get(course.course_id, [])
         elif course.type in [SessionType.LAB, SessionType.TUTORIAL]:
-            valid_instructors = [inst for inst in qualified_instructors if inst.role == InstructorRole.TEACHING_ASSISTANT]
+            valid_instructors = self.ta_instructors.get(course.course_id, [])
         
         if not valid_rooms or not valid_instructors:
-            return []
+            return np.empty((0, 3), dtype=np.int64)
 
-        return [(ts, room, instructor) for ts in self.data.timeslots for room in valid_rooms for instructor in valid_instructors]
+        grid = np.meshgrid(timeslot_ids, np.array(valid_rooms, dtype=np.int64), np.array(valid_instructors, dtype=np.int64), indexing='ij')
+        return np.stack(grid, axis=-1).reshape(-1, 3)
     
-    def _select_next_course_to_schedule(self, unscheduled_sections_map: Dict[Course, FrozenSet[Section]]) -> Optional[Tuple[Course, List[Domain]]]:
+    def _select_next_course_to_schedule(self, unscheduled_sections_map: List[int]) -> Optional[Tuple[int, List[Domain]]]:
         """
-        Selects the next course to schedule using the MRV heuristic.
+        Selects the next course to schedule using the MRV heuristic, breaking ties with
+        the degree heuristic, and returns it with its live values in LCV order.
+
+        A course's size is its sections left to place times the values forward checking
+        has left alive for it, so it shrinks as the partial assignment constrains it.
         """
-        best_candidate = None
-        min_domain_size = float('inf')
-        for course, sections in unscheduled_sections_map.items():
+        best_course = None
+        best_key = None
+        for course in self.courses_to_schedule:
+            sections = unscheduled_sections_map[course]
             if not sections: continue
-            domains = self._generate_valid_domains(course)
-            if not domains: return (course, [])
-            if len(domains) < min_domain_size:
-                min_domain_size = len(domains)
-                best_candidate = (course, domains)
-        return best_candidate
-
-    def _form_valid_groups(self, unscheduled_sections: FrozenSet[Section], room: Optional[Room]) -> Iterator[FrozenSet[Section]]:
+            live_values = self.domains.alive_count[course]
+            if live_values == 0: return (course, [])
+            effective_size = live_values * sections.bit_count()
+            if best_key is not None and effective_size > best_key[0]: continue
+            degree = sum(1 for other in self.course_neighbours[course] if unscheduled_sections_map[other])
+            key = (effective_size, -degree)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_course = course
+        if best_course is None:
+            return None
+        return (best_course, self._order_least_constraining_values(best_course, unscheduled_sections_map))
+
+    def _order_least_constraining_values(self, course: int, unscheduled_sections_map: List[int]) -> List[Domain]:
         """
-        A generator that yields all valid subgroups of sections.
+        Returns the live values of a course sorted by the LCV heuristic: values that would
+        prune the fewest live values of other unscheduled courses come first.
         """
-        if room is None:
-            if unscheduled_sections: yield unscheduled_sections
-            return
+        store = self.domains
+        alive = store.alive[course]
+        timeslots = store.timeslot[course][alive]
+        rooms = store.room[course][alive]
+        instructors = store.instructor[course][alive]
+
+        others = [other for other in self.courses_to_schedule if unscheduled_sections_map[other] and other != course]
+        if not others:
+            return store.live_values(course)
+
+        num_timeslots = len(self.index.timeslots)
+        num_rooms = len(self.index.rooms)
+        num_instructors = len(self.index.instructors)
+        other_alive = [store.alive[other] for other in others]
+        other_ts = np.concatenate([store.timeslot[o][a] for o, a in zip(others, other_alive)])
+        other_rooms = np.concatenate([store.room[o][a] for o, a in zip(others, other_alive)])
+        other_instructors = np.concatenate([store.instructor[o][a] for o, a in zip(others, other_alive)])
+
+        # Live values of other courses in each (timeslot, room) and (timeslot, instructor) bucket.
+        has_room = other_rooms != NO_ID
+        room_load = np.bincount(other_ts[has_room] * num_rooms + other_rooms[has_room], minlength=num_timeslots * num_rooms)
+        has_instructor = other_instructors != NO_ID
+        instructor_load = np.bincount(other_ts[has_instructor] * num_instructors + other_instructors[has_instructor], minlength=num_timeslots * num_instructors)
 
-        sections_by_group: Dict[int, List[Section]] = {}
-        for section in unscheduled_sections:
-            sections_by_group.setdefault(section.group_number, []).append(section)
+        # Live values of same-year courses at each timeslot, which compete for the same sections.
+        year = store.course_year[course]
+        same_year = [o for o, a in zip(others, other_alive) if store.course_year[o] == year]
+        year_ts = np.concatenate([store.timeslot[o][store.alive[o]] for o in same_year]) if same_year else np.zeros(0, dtype=np.int64)
+        year_load = np.bincount(year_ts, minlength=num_timeslots)
 
-        for _, sections_in_group in sections_by_group.items():
+        if self.index.course_is_project[course]:
+            # A project empties its whole day for the year.
+            day_load = np.bincount(self.index.timeslot_day[year_ts], minlength=len(DayOfWeek))
+            cost = day_load[self.index.timeslot_day[timeslots]]
+        else:
+            cost = year_load[timeslots].copy()
+            cost[rooms != NO_ID] += room_load[timeslots * num_rooms + rooms][rooms != NO_ID]
+            cost[instructors != NO_ID] += instructor_load[timeslots * num_instructors + instructors][instructors != NO_ID]
+
+        order = np.argsort(cost, kind='stable')
+        if self.value_jitter:
+            # After a restart, let each value drift a little from its LCV rank.
+            ranks = np.arange(len(order)) + self.rng.random(len(order)) * self.value_jitter * len(order)
+            order = order[np.argsort(ranks, kind='stable')]
+        return list(zip(timeslots[order].tolist(), rooms[order].tolist(), instructors[order].tolist()))
+
+    def _form_valid_groups(self, unscheduled_sections: int, room: int) -> Tuple[int, ...]:
+        """
+        Returns the bitmasks of all valid subgroups of sections, largest first.
+        """
+        if room == NO_ID:
+            return (unscheduled_sections,) if unscheduled_sections else ()
+
+        # Only the room's capacity bucket matters, and the unscheduled sections of a
+        # course take few distinct values along a branch, so the groups are memoized.
+        max_size = self.room_group_size[room]
+        cache_key = (unscheduled_sections, max_size)
+        groups = self.groups_cache.get(cache_key)
+        if groups is not None:
+            return groups
+
+        groups_list = []
+        for group_mask in self.index.group_sections.values():
+            sections_in_group = unscheduled_sections & group_mask
             if not sections_in_group: continue
-            max_size = room.capacity // STANDARD_SECTION_PLANNING_SIZE
-            effective_max_size = min(max_size, len(sections_in_group))
+            effective_max_size = min(max_size, sections_in_group.bit_count())
             for size in range(effective_max_size, 0, -1):
-                for combo in combinations(sections_in_group, size):
-                    yield frozenset(combo)
+                groups_list.extend(iter_submasks(sections_in_group, size))
+
+        groups = self.groups_cache[cache_key] = tuple(groups_list)
+        return groups
 
-    def _backtrack(self, assignment: Assignment, unscheduled_sections_map: Dict[Course, FrozenSet[Section]], start_time: float, timeout_seconds: int) -> Optional[Assignment]:
+    def _backtrack(self, assignment: Assignment, unscheduled_sections_map: List[int], start_time: float, timeout_seconds: int) -> Optional[Assignment]:
         """
         The core recursive backtracking algorithm, supporting both solver modes.
+
+        'assignment' and 'unscheduled_sections_map' are updated in place and restored
+        before returning, so a complete assignment is copied only when it is kept.
         """
         if self.mode == SolverMode.OPTIMIZE:
             if self.search_terminated: return None
             if time.time() - start_time > timeout_seconds:
                 if not self.search_terminated:
-                    print("\n--- Timeout reached! Terminating search. ---")
+                    if self.verbose:
+                        print("\n--- Timeout reached! Terminating search. ---")
                     self.search_terminated = True
                 return None
+
+        if self.restart_pending: return None
+        if self.nodes_left == 0:
+            self.restart_pending = True
+            return None
+        self.nodes_left -= 1
         
-        if all(not sections for sections in unscheduled_sections_map.values()):
+        if self.sections_left == 0:
             if self.mode == SolverMode.FIND_FIRST:
-                return assignment
+                return list(assignment)
             else:
-                solution = self._format_solution(assignment)
-                score = calculate_solution_score(solution.schedule)
-                if score < self.best_score:
-                    print(f"Found a new best solution with score: {score:.2f} (Elapsed time: {time.time() - start_time:.2f}s)")
+                score = self.scorer.score()
+                if score < self._best_bound():
+                    if self.verbose:
+                        print(f"Found a new best solution with score: {score:.2f} (Elapsed time: {time.time() - start_time:.2f}s)")
                     self.best_score = score
-                    self.best_assignment = assignment
+                    self.best_assignment = list(assignment)
+                    self._publish_best(score)
                 return None
 
         selection = self._select_next_course_to_schedule(unscheduled_sections_map)
         if selection is None: return None
         course, domains = selection
+        if not assignment and self.root_values is not None:
+            domains = [domain for domain in domains if domain in self.root_values]
         if not domains: return None
 
         sections_to_schedule = unscheduled_sections_map[course]
+        year = self.domains.course_year[course]
 
         for domain in domains:
-            if self.mode == SolverMode.OPTIMIZE and self.search_terminated: return None
+            if self.search_terminated or self.restart_pending: return None
+            # Only the section check depends on the group, so the other checks run once per
+            # value (for a variable without sections) and each group is just tested
+            # against the sections already busy at the timeslot.
+            if not is_consistent((course, 0, year), domain, self.tables)[0]: continue
+            busy_sections = self.tables.section_slots[domain[DOM_TIMESLOT]]
             for section_group in self._form_valid_groups(sections_to_schedule, domain[DOM_ROOM]):
-                if self.mode == SolverMode.OPTIMIZE and self.search_terminated: return None
+                if self.search_terminated or self.restart_pending: return None
+                if section_group & busy_sections: continue
+
+                variable: Variable = (course, section_group, year)
+                assignment.append((variable, domain))
+                unscheduled_sections_map[course] = sections_to_schedule & ~section_group
+                self.sections_left -= section_group.bit_count()
+
+                push_assignment(variable, domain, self.tables)
+                if self.scorer: self.scorer.push(variable, domain)
+                trail_mark = self.domains.mark()
+                result = None
+                if forward_check(variable, domain, unscheduled_sections_map, self.tables, self.domains) and not self._bound_exceeded():
+                    result = self._backtrack(assignment, unscheduled_sections_map, start_time, timeout_seconds)
+                self.domains.undo(trail_mark)
+                pop_assignment(variable, domain, self.tables)
+                if self.scorer: self.scorer.pop(variable, domain)
+
+                unscheduled_sections_map[course] = sections_to_schedule
+                self.sections_left += section_group.bit_count()
+                assignment.pop()
                 
-                variable: Variable = (course, section_group)
-                is_valid, conflict_msg = is_consistent(variable, domain, assignment)
-
-                if is_valid:
-                    new_assignment = assignment.copy()
-                    new_assignment[variable] = domain
-
-                    new_unscheduled_map = deepcopy(unscheduled_sections_map)
-                    original_set = new_unscheduled_map[course]
-                    updated_set = original_set - section_group
-                    new_unscheduled_map[course] = updated_set
-                    
-                    result = self._backtrack(new_assignment, new_unscheduled_map, start_time, timeout_seconds)
-                    
-                    if self.mode == SolverMode.FIND_FIRST and result is not None:
-                        return result
-                # else: print(conflict_msg)
+                if self.mode == SolverMode.FIND_FIRST and result is not None:
+                    return result
         
         return None
 
-    def _format_solution(self, assignment: Assignment) -> Solution:
+    def _best_bound(self) -> float:
+        """The score a new solution has to beat: the best of this and any other worker."""
+        if self.shared_best is None:
+            return self.best_score
+        return min(self.best_score, self.shared_best.value)
+
+    def _bound_exceeded(self) -> bool:
+        """
+        Branch and bound for OPTIMIZE mode: whether no completion of the current
+        assignment can beat the best score found so far.
         """
-        Converts the internal assignment dictionary into the final Solution Pydantic model.
+        if self.scorer is None: return False
+        bound = self._best_bound()
+        return bound < float('inf') and self.scorer.lower_bound() >= bound
+
+    def _publish_best(self, score: float):
+        """Shares a new best score with the other workers, if there are any."""
+        if self.shared_best is None: return
+        with self.shared_best.get_lock():
+            if score < self.shared_best.value:
+                self.shared_best.value = score
+
+    def _decode_assignment(self, assignment: Assignment) -> List[ScheduledClass]:
+        """
+        Converts the internal assignment into a list of core scheduled classes.
         """
         schedule = []
-        for variable, domain in assignment.items():
+        for (course, sections, _), (ts, room, instructor) in assignment:
             scheduled_class = ScheduledClass(
-                course=variable[0],
-                timeslot=domain[0],
-                room=domain[1],
-                instructor=domain[2],
-                sections=list(variable[1])
+                course=self.index.courses[course],
+                timeslot=self.index.timeslots[ts],
+                room=self.index.rooms[room] if room != NO_ID else None,
+                instructor=self.index.instructors[instructor] if instructor != NO_ID else None,
+                sections=tuple(self.index.mask_sections(sections))
             )
             schedule.append(scheduled_class)
-        return Solution(schedule=schedule)
+        return schedule
+
+    def _format_solution(self, schedule: List[ScheduledClass], score: float) -> Solution:
+        """
+        Converts a decoded schedule into the final Solution Pydantic model.
+        """
+        return Solution(schedule=[to_schema(scheduled_class) for scheduled_class in schedule], score=score)
+
+def _solve_worker(timetable_data: TimetableData, mode: SolverMode, seed: int, root_values: FrozenSet[Domain],
+                  start_time: float, timeout_seconds: int, shared_best, results, verbose: bool):
+    """
+    Entry point of a solve_parallel worker process: searches the part of the tree under
+    'root_values' and sends its (assignment, score) through the 'results' pipe, (None, None)
+    if it has none.
+    'start_time' is the parent's, so start-up time counts against the timeout.
+    """
+    result = (None, None)
+    try:
+        solver = CSPSolver(timetable_data, mode, seed=seed, verbose=verbose)
+        solver.root_values = root_values
+        solver.shared_best = shared_best
+        assignment = solver._search(start_time, timeout_seconds)
+        if assignment:
+            result = (assignment, solver.best_score if mode == SolverMode.OPTIMIZE else None)
+    finally:
+        results.send(result)
+        results.close()
+
+def _receive_result(reader) -> Tuple[Optional[Assignment], Optional[float]]:
+    """
+    Reads a worker's (assignment, score) from its pipe, or (None, None) if the worker
+    exited without sending one.
+    """
+    try:
+        if reader.poll():
+            return reader.recv()
+    except EOFError:
+        pass
+    return (None, None)
 
 if __name__ == '__main__':
     try:
@@ -245,7 +560,7 @@ if __name__ == '__main__':
         
         # # --- Example of running in OPTIMIZE mode ---
         # print("--- RUNNING IN OPTIMIZE MODE ---")
-        # solver_optimize = CSPSolver(timetable_data, mode=SolverMode.OPTIMIZE)
+        # solver_optimize = CSPSolver(timetable_data, mode=SolverMode.OPTIMIZE, verbose=True)
         # solution_optimize = solver_optimize.solve(timeout_seconds=60)
         # if solution_optimize:
         #     print(f"\nOptimization Complete! Best solution found with score: {solution_optimize.score:.2f}")
@@ -258,7 +573,7 @@ if __name__ == '__main__':
 
         # --- Example of running in FIND_FIRST mode ---
         print("--- RUNNING IN FIND FIRST MODE ---")
-        solver_first = CSPSolver(timetable_data, mode=SolverMode.FIND_FIRST)
+        solver_first = CSPSolver(timetable_data, mode=SolverMode.FIND_FIRST, verbose=True)
         solution_first = solver_first.solve()
         if solution_first:
             print(f"\nFirst solution found! Score: {solution_first.score:.2f}")
@@ -1,111 +1,69 @@
+import importlib.util
 import pandas as pd
 from pathlib import Path
 from typing import List, Any
+from pydantic import TypeAdapter
 from schemas import (
     TimetableData, Course, Instructor, Room, TimeSlot, Section,
     Curriculum, SessionType
 )
 
-def _parse_comma_separated_field(value: Any) -> List[str]:
+# The Rust-backed calamine reader is much faster than openpyxl, but optional.
+_EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') is not None else 'openpyxl'
+
+# Bulk validators: one call checks a whole sheet's records instead of one model per row.
+_COURSES = TypeAdapter(List[Course])
+_INSTRUCTORS = TypeAdapter(List[Instructor])
+_ROOMS = TypeAdapter(List[Room])
+_TIMESLOTS = TypeAdapter(List[TimeSlot])
+_SECTIONS = TypeAdapter(List[Section])
+_CURRICULUM = TypeAdapter(List[Curriculum])
+
+def _parse_comma_separated_column(column: pd.Series) -> pd.Series:
     """
-    Safely parses a string that may contain comma-separated values into a list of strings.
-    Handles empty, NaN, or non-string values gracefully.
+    Splits a column of cells that may contain comma-separated values into lists of strings.
+    Empty or NaN cells become empty lists.
     """
-    if pd.isna(value):
-        return []
-    s_value = str(value)
-    if not s_value.strip():
-        return []
-    items = [item.strip() for item in s_value.split(',')]
-    return [item for item in items if item]
+    items = column.fillna('').astype(str).str.split(',')
+    return items.map(lambda values: [value.strip() for value in values if value.strip()])
 
 def _parse_courses(df: pd.DataFrame) -> List[Course]:
     """
     Parses the courses DataFrame, creating a separate Course object for each type
     listed in the comma-separated 'type' column.
     """
-    courses: List[Course] = []
-    for _, row in df.iterrows():
-        types = _parse_comma_separated_field(row['type'])
-        for single_type in types:
-            try:
-                course = Course(
-                    course_id=row['course_id'],
-                    course_name=row['course_name'],
-                    type=SessionType(single_type) 
-                )
-                courses.append(course)
-            except ValueError:
-                print(f"Warning: Skipping invalid course type '{single_type}' for course '{row['course_id']}'.")
-    return courses
+    sessions = df.assign(type=_parse_comma_separated_column(df['type'])).explode('type').dropna(subset=['type'])
+    valid = sessions['type'].isin([session_type.value for session_type in SessionType])
+    for course_id, single_type in zip(sessions.loc[~valid, 'course_id'], sessions.loc[~valid, 'type']):
+        print(f"Warning: Skipping invalid course type '{single_type}' for course '{course_id}'.")
+    return _COURSES.validate_python(sessions.loc[valid, ['course_id', 'course_name', 'type']].to_dict('records'))
 
 def _parse_instructors(df: pd.DataFrame) -> List[Instructor]:
     """
     Parses the instructors DataFrame, handling the comma-separated 'qualifications' column.
     """
-    instructors: List[Instructor] = []
-    for _, row in df.iterrows():
-        qualifications = _parse_comma_separated_field(row['qualifications'])
-        instructor = Instructor(
-            instructor_id=row['instructor_id'],
-            name=row['name'],
-            role=row['role'],
-            qualifications=qualifications
-        )
-        instructors.append(instructor)
-    return instructors
+    records = df.assign(qualifications=_parse_comma_separated_column(df['qualifications']))
+    return _INSTRUCTORS.validate_python(records[['instructor_id', 'name', 'role', 'qualifications']].to_dict('records'))
 
 def _parse_rooms(df: pd.DataFrame) -> List[Room]:
     """
     Parses the rooms DataFrame, handling the comma-separated 'types' column.
     """
-    rooms: List[Room] = []
-    for _, row in df.iterrows():
-        types = _parse_comma_separated_field(row['type'])
-        room = Room(
-            room_id=row['room_id'],
-            types=[SessionType(t) for t in types],
-            capacity=row['capacity']
-        )
-        rooms.append(room)
-    return rooms
+    records = df.assign(types=_parse_comma_separated_column(df['type']))
+    return _ROOMS.validate_python(records[['room_id', 'types', 'capacity']].to_dict('records'))
 
 def _parse_timeslots(df: pd.DataFrame) -> List[TimeSlot]:
     """Parses the timeslots DataFrame into a list of TimeSlot objects."""
-    timeslots: List[TimeSlot] = []
-    for _, row in df.iterrows():
-        timeslot = TimeSlot(
-            timeslot_id=row['time_slot_id'],
-            day=row['day'],
-            start_time=row['start_time'],
-            end_time=row['end_time']
-        )
-        timeslots.append(timeslot)
-    return timeslots
+    records = df.rename(columns={'time_slot_id': 'timeslot_id'})
+    return _TIMESLOTS.validate_python(records[['timeslot_id', 'day', 'start_time', 'end_time']].to_dict('records'))
 
 def _parse_sections(df: pd.DataFrame) -> List[Section]:
     """Parses the sections DataFrame into a list of Section objects."""
-    sections: List[Section] = []
-    for _, row in df.iterrows():
-        section = Section(
-            section_id=row['section_id'],
-            group_number=row['group_number'],
-            year=row['year'],
-            student_count=row['student_count']
-        )
-        sections.append(section)
-    return sections
+    return _SECTIONS.validate_python(df[['section_id', 'group_number', 'year', 'student_count']].to_dict('records'))
 
 def _parse_curriculum(df: pd.DataFrame) -> List[Curriculum]:
     """Parses the curriculum DataFrame into a list of Curriculum objects."""
-    curriculum: List[Curriculum] = []
-    for _, row in df.iterrows():
-        curr = Curriculum(
-            year=row['year'],
-            course_id=row['course_id']
-        )
-        curriculum.append(curr)
-    return curriculum
+    return _CURRICULUM.validate_python(df[['year', 'course_id']].to_dict('records'))
 
 def load_timetable_data_from_excel(file_path: Any) -> TimetableData:
     """
@@ -119,7 +77,7 @@ def load_timetable_data_from_excel(file_path: Any) -> TimetableData:
             if not file_path_obj.exists():
                 raise FileNotFoundError(f'Fatal Error: provided file path {file_path_obj} does not exist.')
         
-        sheets = pd.read_excel(file_path_obj, sheet_name=None)
+        sheets = pd.read_excel(file_path_obj, sheet_name=None, engine=_EXCEL_ENGINE)
 
         courses: List[Course] = []
         instructors: List[Instructor] = []
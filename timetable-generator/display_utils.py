@@ -1,6 +1,8 @@
 import pandas as pd
-from schemas import Solution, DayOfWeek, InstructorRole, Aliases
-from typing import Dict, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from schemas import Solution, DayOfWeek, InstructorRole, Aliases, SessionType
+from typing import Any, Dict, Optional, Set, Tuple
 from datetime import time
 from constraints import SLOT_ORDER
 
@@ -10,63 +12,93 @@ ROLE_TO_ALIAS = {
     InstructorRole.TEACHING_ASSISTANT: Aliases.TEACHING_ASSISTANT,
 }
 
-def format_solution_for_display(solution: Solution) -> Dict[Tuple[int, int], pd.DataFrame]:
+# The grid columns, and plain-string lookups for the enum values read in the class loop.
+_DAY_ORDER = tuple(day.value for day in DayOfWeek)
+DAY_VALUE = {day: day.value for day in DayOfWeek}
+TYPE_VALUE = {session_type: session_type.value for session_type in SessionType}
+
+@lru_cache(maxsize=None)
+def _fmt_slot(start: time, end: time) -> str:
+    """Formats a slot's time range; there are only a handful of distinct slots."""
+    return f"{start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}"
+
+def _slot_key(slot: Tuple[time, time]) -> int:
+    """Orders grid rows by SLOT_ORDER, with unknown start times last."""
+    return SLOT_ORDER.get(slot[0], 99)
+
+def format_solution_for_display(solution: Solution, only_year: Optional[int] = None) -> Dict[Tuple[int, int], pd.DataFrame]:
     """
     Transforms the flat schedule from the solver into a dictionary of pivot tables
     (grids), one for each student group, ready for display in Streamlit.
+    If 'only_year' is given, grids are built for that year's groups only.
     """
     
-    processed_data = []
+    # {(year, group): {(start, end): {day: content}}}; the first class placed in a cell is kept.
+    group_cells: Dict[Tuple[int, int], Dict[Tuple[time, time], Dict[str, str]]] = defaultdict(lambda: defaultdict(dict))
     for cls in solution.schedule:
-        for section in cls.sections:
-            
-            section_ids = sorted(list(set(s.section_id for s in cls.sections)))
-
-            alias = ROLE_TO_ALIAS[cls.instructor.role] if cls.instructor else ""
-            
-            cell_content = (
-                f"<b>{cls.course.course_name}({cls.course.course_id}) ({cls.course.type.value})</b><br>"
-                f"{alias} {cls.instructor.name if cls.instructor else 'N/A'}<br>"
-                f"{cls.room.room_id if cls.room else 'N/A'}<br>"
-                f"Sec: {', '.join(map(str, section_ids))}"
-            )
-
-            record = {
-                "year": section.year,
-                "group_number": section.group_number,
-                "day": cls.timeslot.day.value,
-                "time_str": f"{cls.timeslot.start_time.strftime('%I:%M %p')} - {cls.timeslot.end_time.strftime('%I:%M %p')}",
-                "sort_key": SLOT_ORDER.get(cls.timeslot.start_time, 99),
-                "content": cell_content
-            }
-            processed_data.append(record)
-
-    if not processed_data:
-        return {}
-
-    df = pd.DataFrame(processed_data).drop_duplicates()
-
-    time_order_df = df[['sort_key', 'time_str']].drop_duplicates().sort_values('sort_key')
-    time_order = time_order_df['time_str'].tolist()
+        # Everything but the year and group is the same for every section of the class.
+        alias = ROLE_TO_ALIAS[cls.instructor.role] if cls.instructor else ""
+        
+        cell_content = (
+            f"<b>{cls.course.course_name}({cls.course.course_id}) ({TYPE_VALUE[cls.course.type]})</b><br>"
+            f"{alias} {cls.instructor.name if cls.instructor else 'N/A'}<br>"
+            f"{cls.room.room_id if cls.room else 'N/A'}<br>"
+            f"Sec: {cls.sections_label}"
+        )
+        day = DAY_VALUE[cls.timeslot.day]
+        slot = (cls.timeslot.start_time, cls.timeslot.end_time)
 
-    df['time_str'] = pd.Categorical(df['time_str'], categories=time_order, ordered=True)
-    
-    day_order = [day.value for day in DayOfWeek]
+        for section in cls.sections:
+            if only_year is not None and section.year != only_year:
+                continue
+            group_cells[(section.year, section.group_number)][slot].setdefault(day, cell_content)
 
     group_timetables = {}
-    for (year, group), group_df in df.groupby(['year', 'group_number']):
-        
-        pivot_table = group_df.pivot_table(
-            index='time_str', 
-            columns='day',
-            values='content',
-            aggfunc='first',
-            observed=False 
-        ).fillna('')
-
-        pivot_table = pivot_table.reindex(columns=day_order).fillna('')
-        
-        group_timetables[(year, group)] = pivot_table
+    for (year, group), cells in sorted(group_cells.items()):
+        slots = sorted(cells, key=_slot_key)
+        # The cells are ready-made HTML strings, so declare the dtype rather than infer it.
+        group_timetables[(year, group)] = pd.DataFrame(
+            [[cells[slot].get(day, '') for day in _DAY_ORDER] for slot in slots],
+            index=pd.Index([_fmt_slot(*slot) for slot in slots], name='time_str'),
+            columns=pd.Index(_DAY_ORDER, name='day'),
+            dtype=object
+        )
 
     return group_timetables
 
+def render_timetable_html(timetable_df: pd.DataFrame) -> str:
+    """
+    Renders a grid from format_solution_for_display as an HTML table. The cells are
+    inserted unescaped, like to_html(escape=False), without pandas' formatter.
+    """
+    parts = ['<table border="1" class="dataframe">', '<thead><tr style="text-align: right;"><th>Time</th>']
+    parts.extend(f'<th>{day}</th>' for day in timetable_df.columns)
+    parts.append('</tr></thead><tbody>')
+    for time_str, *cells in timetable_df.itertuples(index=True, name=None):
+        parts.append(f'<tr><th>{time_str}</th>')
+        parts.extend(f'<td>{cell}</td>' for cell in cells)
+        parts.append('</tr>')
+    parts.append('</tbody></table>')
+    return ''.join(parts)
+
+def build_filter_index(solution: Solution) -> Dict[str, Dict[Any, Set[int]]]:
+    """
+    Maps every filter value to the positions of the classes in solution.schedule that
+    match it, so a filter change only intersects sets instead of rescanning the schedule.
+    """
+    index: Dict[str, Dict[Any, Set[int]]] = {
+        'instructor': defaultdict(set),
+        'year': defaultdict(set),
+        'section': defaultdict(set),
+        'room': defaultdict(set),
+    }
+    for position, cls in enumerate(solution.schedule):
+        if cls.instructor:
+            index['instructor'][cls.instructor.name].add(position)
+        if cls.room:
+            index['room'][cls.room.room_id].add(position)
+        for section in cls.sections:
+            index['year'][section.year].add(position)
+            index['section'][section.section_id].add(position)
+
+    return {name: dict(positions) for name, positions in index.items()}
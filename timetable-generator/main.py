@@ -1,8 +1,27 @@
 import streamlit as st
+from typing import Optional
 from schemas import SolverMode, Solution
 from data_loader import load_timetable_data_from_excel
 from csp_solver import CSPSolver
-from display_utils import format_solution_for_display
+from display_utils import format_solution_for_display, build_filter_index, render_timetable_html
+
+def _schedule_key(solution: Solution) -> tuple:
+    """Everything format_solution_for_display reads from a solution, as plain values."""
+    return tuple(
+        (
+            cls.course.course_id, cls.course.course_name, cls.course.type.value,
+            cls.timeslot.day.value, cls.timeslot.start_time, cls.timeslot.end_time,
+            cls.room.room_id if cls.room else None,
+            (cls.instructor.name, cls.instructor.role.value) if cls.instructor else None,
+            tuple((sec.year, sec.group_number, sec.section_id) for sec in cls.sections),
+        )
+        for cls in solution.schedule
+    )
+
+@st.cache_data(hash_funcs={Solution: _schedule_key}, max_entries=64)
+def cached_group_timetables(solution: Solution, only_year: Optional[int] = None):
+    """format_solution_for_display, reused across reruns that show the same classes."""
+    return format_solution_for_display(solution, only_year)
 
 st.set_page_config(
     page_title="Automated Timetable Generator",
@@ -69,10 +88,14 @@ if generate_button:
                     st.success("Timetable Generated Successfully!")
                     st.session_state['timetable_data'] = timetable_data
                     st.session_state['solution'] = solution
+                    st.session_state['filter_index'] = build_filter_index(solution)
+                    if 'solution_json' in st.session_state: del st.session_state['solution_json']
                 else:
                     st.error("No solution could be found that satisfies all constraints.")
                     if 'solution' in st.session_state: del st.session_state['solution']
                     if 'timetable_data' in st.session_state: del st.session_state['timetable_data']
+                    if 'filter_index' in st.session_state: del st.session_state['filter_index']
+                    if 'solution_json' in st.session_state: del st.session_state['solution_json']
             except Exception as e:
                 st.error(f"An error occurred while running the solver: {e}")
     else:
@@ -81,6 +104,7 @@ if generate_button:
 if 'solution' in st.session_state:
     solution = st.session_state['solution']
     timetable_data = st.session_state['timetable_data']
+    filter_index = st.session_state['filter_index']
 
     st.header("Filter and View Timetables")
     st.info(f"Displaying solution with score: **{solution.score:.2f}**")
@@ -99,45 +123,40 @@ if 'solution' in st.session_state:
         rooms = ["All"] + (list(set(room.room_id for room in timetable_data.rooms)))
         selected_room = st.selectbox("Filter by Room", options=rooms)
 
-    filtered_schedule = solution.schedule
-    if selected_instructor != "All":
-        filtered_schedule = [
-            cls for cls in filtered_schedule 
-            if cls.instructor and cls.instructor.name == selected_instructor
-        ]
-    if selected_year != "All":
-        filtered_schedule = [
-            cls for cls in filtered_schedule 
-            if any(sec.year == selected_year for sec in cls.sections)
-        ]
-    if selected_section != "All":
-        filtered_schedule = [
-            cls for cls in filtered_schedule
-            if any(sec.section_id == selected_section for sec in cls.sections)
-        ]
-    if selected_room != "All":
-        filtered_schedule = [
-            cls for cls in filtered_schedule
-            if cls.room and cls.room.room_id == selected_room 
-        ]
+    selections = {
+        'instructor': selected_instructor,
+        'year': selected_year,
+        'section': selected_section,
+        'room': selected_room,
+    }
+    active = [filter_index[name].get(value, set()) for name, value in selections.items() if value != "All"]
+    if active:
+        positions = set.intersection(*active)
+        filtered_schedule = [solution.schedule[position] for position in sorted(positions)]
+    else:
+        filtered_schedule = solution.schedule
     
-    filtered_schedule_data = [cls.model_dump() for cls in filtered_schedule]
-    filtered_solution = Solution(schedule=filtered_schedule_data, score=solution.score)
+    # The classes are already validated, so skip re-validating them for every rerun.
+    filtered_solution = Solution.model_construct(schedule=filtered_schedule, score=solution.score)
     
-    group_timetables = format_solution_for_display(filtered_solution)
+    only_year = None if selected_year == "All" else selected_year
+    group_timetables = cached_group_timetables(filtered_solution, only_year)
 
     if not group_timetables:
         st.warning("No classes match the current filter criteria.")
     else:
         for (year, group), timetable_df in sorted(group_timetables.items()):
-            if (selected_year == "All" or year == selected_year):
-                st.subheader(f"Year {year}, Group {group}")
-                st.markdown(timetable_df.to_html(escape=False), unsafe_allow_html=True)
-                st.write("---")
+            # Groups start collapsed, so the page does not lay out every grid up front.
+            with st.expander(f"Year {year}, Group {group}", expanded=False):
+                st.markdown(render_timetable_html(timetable_df), unsafe_allow_html=True)
     
+    # Serialized once per solution rather than on every rerun.
+    if 'solution_json' not in st.session_state:
+        st.session_state['solution_json'] = solution.model_dump_json(indent=2)
+
     st.download_button(
         label="Download Full Timetable as JSON",
-        data=solution.model_dump_json(indent=2),
+        data=st.session_state['solution_json'],
         file_name="timetable_full.json",
         mime="application/json"
     )
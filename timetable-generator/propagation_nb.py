@@ -0,0 +1,63 @@
+"""
+Numba-compiled kernels for forward checking.
+
+The kernels work on the flat value arrays of a DomainStore, where every course owns
+the slice [course_start, course_end) of one shared timeslot/room/instructor/day layout,
+and on its trail buffer of pruned value positions. forward_check only goes through them
+when USE_NUMBA is set in constraints.py; without Numba the NumPy path is used.
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the decorated function untouched."""
+        return lambda func: func
+
+# The loops are a few hundred values long, far too short to pay for threads.
+_JIT_OPTIONS = dict(cache=True, boundscheck=False, error_model='numpy')
+
+@njit("b1(i8[:], b1[:], b1[:], i8, i8, i8, i8, i8[:], i8[:], i8[:], i8[:], i8[:], i8[:], b1[:], i8[:], i8[:], i8[:])", **_JIT_OPTIONS)
+def prune_neighbours_nb(courses, sections_full, day_taken, ts, room, instructor, day,
+                        course_start, course_end, value_timeslot, value_room, value_instructor, value_day,
+                        value_alive, alive_count, trail, trail_top):
+    """
+    Prunes the values of 'courses' that clash with a placement at (ts, room, instructor).
+
+    sections_full[k] means every remaining section of courses[k] is busy at 'ts', and
+    day_taken[k] that a project rules out 'day' for it. Pruned positions are pushed on
+    the trail. Returns False as soon as a course is left without live values.
+    """
+    top = trail_top[0]
+    for k in range(courses.shape[0]):
+        course = courses[k]
+        for value in range(course_start[course], course_end[course]):
+            if not value_alive[value]:
+                continue
+            dead = day_taken[k] and value_day[value] == day
+            if not dead and value_timeslot[value] == ts:
+                dead = (sections_full[k]
+                        or (room >= 0 and value_room[value] == room)
+                        or (instructor >= 0 and value_instructor[value] == instructor))
+            if dead:
+                value_alive[value] = False
+                alive_count[course] -= 1
+                trail[top] = value
+                top += 1
+        if alive_count[course] == 0:
+            trail_top[0] = top
+            return False
+    trail_top[0] = top
+    return True
+
+@njit("void(i8, i8[:], i8[:], b1[:], i8[:], i8[:])", **_JIT_OPTIONS)
+def restore_values_nb(mark, value_course, trail, value_alive, alive_count, trail_top):
+    """Revives every value pushed on the trail since 'mark'."""
+    for i in range(mark, trail_top[0]):
+        value = trail[i]
+        value_alive[value] = True
+        alive_count[value_course[value]] += 1
+    trail_top[0] = mark
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
-from typing import List, Optional
+from functools import cached_property
+from typing import List, Optional, Tuple
 from datetime import time
 
 
@@ -46,8 +47,7 @@ class Course(BaseModel):
     course_name: str = Field(description="The name of the course subject (e.g., 'Introduction to Programming').")
     type: SessionType = Field(description="The specific type of this session: Lecture, Lab, or Tutorial.")
 
-    class Config:
-        frozen = True
+    model_config = ConfigDict(frozen=True)
 
 class Instructor(BaseModel):
     """Represents a single instructor, including their role and qualifications."""
@@ -56,12 +56,16 @@ class Instructor(BaseModel):
     role: InstructorRole = Field(description="The role of the instructor.")
     qualifications: List[str] = Field(description="A list of course_ids the instructor is qualified to teach.")
 
+    model_config = ConfigDict(frozen=True)
+
 class Room(BaseModel):
     """Represents a physical room where classes can be held."""
     room_id: str = Field(description="Primary key. Unique identifier for the room (e.g., 'B1-101').")
     types: List[SessionType] = Field(description="The type of room, which must match the course offering type.")
     capacity: int = Field(description="The maximum number of students the room can accommodate.")
 
+    model_config = ConfigDict(frozen=True)
+
 class TimeSlot(BaseModel):
     """Represents a single, 1.5-hour discrete time slot in the weekly schedule."""
     timeslot_id: str = Field(description="Primary key. Unique identifier for the time slot (e.g., 'sun_0900_1030').")
@@ -69,6 +73,8 @@ class TimeSlot(BaseModel):
     start_time: time = Field(description="The starting time of the slot.")
     end_time: time = Field(description="The ending time of the slot.")
 
+    model_config = ConfigDict(frozen=True)
+
 class Section(BaseModel):
     """Represents a specific group of students. The primary key is a composite of section_id and year."""
     section_id: int = Field(description="Part of the composite primary key. The identifier for the section within its year (1-9).")
@@ -76,8 +82,7 @@ class Section(BaseModel):
     year: int = Field(description="Part of the composite primary key. The academic year of the section (1-4).")
     student_count: int = Field(description="The number of students in this section.")
 
-    class Config:
-        frozen = True
+    model_config = ConfigDict(frozen=True)
 
 class Curriculum(BaseModel):
     """Links a year to the courses they must take. The primary key is a composite of course_id and year."""
@@ -105,6 +110,21 @@ class ScheduledClass(BaseModel):
     instructor: Optional[Instructor] = Field(None, description="The instructor assigned. Null for 'Project' type.")
     sections: List[Section] = Field(..., description="The list of student sections attending this class.")
 
+    model_config = ConfigDict(frozen=True)
+
+    # Both properties below are cached in the instance __dict__, which model_copy copies
+    # as-is: a copy made with update={'sections': ...} would keep the old ids and label.
+    # Build a new ScheduledClass instead of copying one with different sections.
+    @cached_property
+    def sorted_section_ids(self) -> Tuple[int, ...]:
+        """The distinct section ids attending this class, in ascending order."""
+        return tuple(sorted({section.section_id for section in self.sections}))
+
+    @cached_property
+    def sections_label(self) -> str:
+        """The sorted section ids as shown in the timetable, e.g. '1, 2, 3'."""
+        return ', '.join(str(section_id) for section_id in self.sorted_section_ids)
+
 class Solution(BaseModel):
     """The complete timetable solution, represented as a flat list of scheduled classes for easy processing."""
     schedule: List[ScheduledClass]
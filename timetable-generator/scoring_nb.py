@@ -0,0 +1,75 @@
+"""
+Numba-compiled kernels for the soft constraint scoring.
+
+The kernels take the flat (section, day, slot) columns built by calculate_solution_score
+and reduce them with one loop over the sections. Scoring only goes through
+them when USE_NUMBA is set in constraints.py; without Numba the NumPy path is used.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the decorated function untouched."""
+        return lambda func: func
+
+# Explicit signatures make Numba compile eagerly, and cache=True stores the compiled
+# code under __pycache__ so only the very first run pays the compilation cost. There are
+# only a few dozen sections, far too few to pay for threads.
+_JIT_OPTIONS = dict(cache=True, boundscheck=False, error_model='numpy')
+
+@njit("f8(i4[:], i4[:], i4[:], i8, i8, i8)", **_JIT_OPTIONS)
+def gap_penalty_nb(section_ids, day_ids, slot_ids, num_sections, num_days, num_slots):
+    """
+    Counts the free slots between the first and last class of every section's days.
+    """
+    occupied = np.zeros((num_sections, num_days, num_slots), dtype=np.bool_)
+    for i in range(section_ids.shape[0]):
+        if slot_ids[i] >= 0:
+            occupied[section_ids[i], day_ids[i], slot_ids[i]] = True
+
+    total = 0.0
+    for section in range(num_sections):
+        gaps = 0
+        for day in range(num_days):
+            first = -1
+            last = -1
+            classes = 0
+            for slot in range(num_slots):
+                if occupied[section, day, slot]:
+                    if first < 0:
+                        first = slot
+                    last = slot
+                    classes += 1
+            if classes > 0:
+                gaps += last - first + 1 - classes
+        total += gaps
+    return total
+
+@njit("f8(i4[:], i4[:], i8, i8)", **_JIT_OPTIONS)
+def distribution_penalty_nb(section_ids, day_ids, num_sections, num_days):
+    """
+    Sums the sample standard deviation of every scheduled section's classes per day.
+    """
+    daily_counts = np.zeros((num_sections, num_days), dtype=np.int64)
+    for i in range(section_ids.shape[0]):
+        daily_counts[section_ids[i], day_ids[i]] += 1
+
+    total = 0.0
+    for section in range(num_sections):
+        classes = 0
+        for day in range(num_days):
+            classes += daily_counts[section, day]
+        if classes == 0:
+            continue
+        mean = classes / num_days
+        squares = 0.0
+        for day in range(num_days):
+            squares += (daily_counts[section, day] - mean) ** 2
+        total += np.sqrt(squares / (num_days - 1))
+    return total
@@ -0,0 +1,141 @@
+"""
+Checks that the incremental Scorer, its lower bound and the compiled scoring kernels
+agree with the full recompute of the soft constraint score.
+"""
+import random
+from datetime import time
+from itertools import combinations
+from pathlib import Path
+from statistics import stdev
+
+import pytest
+
+import constraints
+from constraints import ProblemIndex, Scorer, SLOT_ORDER, UNDESIRABLE_SLOTS, calculate_solution_score
+from core import ScheduledClass, to_core
+from data_loader import load_timetable_data_from_excel
+from schemas import DayOfWeek, TimeSlot
+
+TABLES_PATH = Path(__file__).resolve().parent.parent / 'Tables.xlsx'
+
+@pytest.fixture(scope='module')
+def index() -> ProblemIndex:
+    """The sample data, plus one 16:00 timeslot per day that lies outside SLOT_ORDER."""
+    data = load_timetable_data_from_excel(TABLES_PATH)
+    late = [
+        TimeSlot(timeslot_id=f'late_{day.name}', day=day, start_time=time(16, 0), end_time=time(17, 30))
+        for day in DayOfWeek
+    ]
+    return ProblemIndex(to_core(data.model_copy(update={'timeslots': data.timeslots + late})))
+
+def _random_variables(index: ProblemIndex, rng: random.Random, count: int):
+    """Random (variable, domain) placements of a few sections of one year each."""
+    placements = []
+    for _ in range(count):
+        year = rng.choice(sorted(index.year_sections))
+        bits = [bit for bit in range(len(index.sections)) if index.year_sections[year] >> bit & 1]
+        sections = sum(1 << bit for bit in rng.sample(bits, rng.randint(1, min(3, len(bits)))))
+        course = rng.randrange(len(index.courses))
+        placements.append(((course, sections, year), (rng.randrange(len(index.timeslots)), -1, -1)))
+    return placements
+
+def _decode(index: ProblemIndex, placements) -> list:
+    return [
+        ScheduledClass(index.courses[variable[0]], index.timeslots[domain[0]], None, None, tuple(index.mask_sections(variable[1])))
+        for variable, domain in placements
+    ]
+
+def _reference_score(schedule) -> float:
+    """The soft constraint score written out per section and day, as the original scorer did."""
+    section_timeslots = {}
+    for cls in schedule:
+        for section in cls.sections:
+            section_timeslots.setdefault((section.year, section.section_id), []).append(cls.timeslot)
+
+    score = sum(1 for cls in schedule if SLOT_ORDER.get(cls.timeslot.start_time) in UNDESIRABLE_SLOTS) * 3.0
+    for timeslots in section_timeslots.values():
+        slots_by_day = {}
+        for ts in timeslots:
+            if ts.start_time in SLOT_ORDER:
+                slots_by_day.setdefault(ts.day, []).append(SLOT_ORDER[ts.start_time])
+        for slots in slots_by_day.values():
+            slots.sort()
+            score += 5.0 * sum(max(b - a - 1, 0) for a, b in zip(slots, slots[1:]))
+        daily_counts = {day: 0 for day in DayOfWeek}
+        for ts in timeslots:
+            daily_counts[ts.day] += 1
+        score += stdev(daily_counts.values())
+    return score
+
+@pytest.mark.parametrize('use_numba', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not constraints.NUMBA_AVAILABLE, reason='Numba is not installed'))
+])
+def test_full_score_matches_reference(index, monkeypatch, use_numba):
+    monkeypatch.setattr(constraints, 'USE_NUMBA', use_numba)
+    rng = random.Random(0)
+    for _ in range(50):
+        schedule = _decode(index, _random_variables(index, rng, rng.randint(1, 60)))
+        assert calculate_solution_score(schedule, index) == pytest.approx(_reference_score(schedule))
+
+def test_scorer_matches_full_recompute(index):
+    rng = random.Random(1)
+    scorer = Scorer(index)
+    placed = []
+    for variable, domain in _random_variables(index, rng, 300):
+        if placed and rng.random() < 0.4:
+            scorer.pop(*placed.pop(rng.randrange(len(placed))))
+        else:
+            scorer.push(variable, domain)
+            placed.append((variable, domain))
+        assert scorer.score() == pytest.approx(calculate_solution_score(_decode(index, placed), index))
+
+    for placement in placed:
+        scorer.pop(*placement)
+    assert scorer.score() == 0.0
+    assert not scorer.classes_at.any()
+
+def test_lower_bound_is_admissible(index):
+    """Brute-forces every completion of one section's partial week."""
+    rng = random.Random(2)
+    year = min(index.year_sections)
+    section = index.year_sections[year] & -index.year_sections[year]
+    variable = (0, section, year)
+    for _ in range(40):
+        placed = rng.sample(range(len(index.timeslots)), rng.randint(0, 8))
+        left = rng.randint(1, 2)
+        scorer = Scorer(index)
+        scorer.set_workload([section] * (len(placed) + left))
+        for ts in placed:
+            scorer.push(variable, (ts, -1, -1))
+        bound = scorer.lower_bound()
+
+        free = [ts for ts in range(len(index.timeslots)) if ts not in placed]
+        best = float('inf')
+        for completion in combinations(free, left):
+            for ts in completion:
+                scorer.push(variable, (ts, -1, -1))
+            best = min(best, scorer.score())
+            for ts in completion:
+                scorer.pop(variable, (ts, -1, -1))
+        assert bound <= best + 1e-9
+
+def test_lower_bound_of_partial_assignments(index):
+    rng = random.Random(3)
+    placements = _random_variables(index, rng, 150)
+    scorer = Scorer(index)
+    scorer.set_workload([variable[1] for variable, _ in placements])
+    for placement in placements:
+        scorer.push(*placement)
+    full = scorer.score()
+    assert scorer.lower_bound() == pytest.approx(full)
+    for placement in placements:
+        scorer.pop(*placement)
+
+    for _ in range(50):
+        subset = [placement for placement in placements if rng.random() < 0.5]
+        for placement in subset:
+            scorer.push(*placement)
+        assert scorer.lower_bound() <= full + 1e-9
+        for placement in subset:
+            scorer.pop(*placement)